@@ -1,7 +1,16 @@
+import asyncio
+import logging
 from datetime import datetime, timedelta
 from models import Badge, Achievement, User, Team, team_members
 from app import db_session
-from sqlalchemy import select
+from sqlalchemy import select, func
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for repeated triggers for the same user before evaluating
+BADGE_COALESCE_WINDOW = 2.0
+# Evaluation attempts per user before a failing trigger is dropped
+BADGE_MAX_ATTEMPTS = 3
 
 # Define badge types
 BADGES = {
@@ -51,67 +60,166 @@ def initialize_badges():
             db_session.add(badge)
     db_session.commit()
 
-def award_badge(user_id: int, badge_name: str) -> bool:
-    """Award a badge to a user if they don't already have it"""
-    badge = db_session.query(Badge).filter_by(name=BADGES[badge_name]['name']).first()
-    if not badge:
-        return False
-
-    existing_achievement = db_session.query(Achievement).filter_by(
-        user_id=user_id, badge_id=badge.id
-    ).first()
-
-    if existing_achievement:
-        return False
-
-    achievement = Achievement(user_id=user_id, badge_id=badge.id)
-    db_session.add(achievement)
-    db_session.commit()
-    return True
-
-def check_and_award_badges(user_id: int) -> list:
-    """Check and award any new badges a user has earned"""
-    user = db_session.query(User).get(user_id)
-    if not user:
-        return []
+def check_and_award_badges_batch(user_ids: list) -> dict:
+    """
+    Check and award new badges for several users at once. Badge definitions,
+    existing achievements and team statistics are loaded with one query each for
+    the whole batch, and all new achievements are committed together.
+    Returns a dict mapping each user id to the list of newly earned badges.
+    """
+    badge_ids = dict(db_session.execute(select(Badge.name, Badge.id)).all())
+    users = db_session.execute(select(User.id).where(User.id.in_(user_ids))).scalars().all()
+    if not users:
+        return {}
+
+    earned = set(db_session.execute(
+        select(Achievement.user_id, Achievement.badge_id).where(Achievement.user_id.in_(users))
+    ).all())
+
+    led_counts = dict(db_session.execute(
+        select(Team.leader_id, func.count(Team.id)).where(Team.leader_id.in_(users)).group_by(Team.leader_id)
+    ).all())
 
-    new_badges = []
-
-    # Check Team Creator badge
-    if db_session.query(Team).filter_by(leader_id=user.id).first():
-        if award_badge(user.id, 'team_creator'):
-            new_badges.append(BADGES['team_creator'])
-
-    # Check Team Joiner badge
-    if len(user.teams) > 0:
-        if award_badge(user.id, 'team_joiner'):
-            new_badges.append(BADGES['team_joiner'])
-
-    # Check Active Leader badge
-    if db_session.query(Team).filter_by(leader_id=user.id).count() >= 3:
-        if award_badge(user.id, 'active_leader'):
-            new_badges.append(BADGES['active_leader'])
-
-    # Check Quick Joiner badge
     # Query the team_members association table directly
-    stmt = select(team_members.c.joined_at, Team.created_at).join(
+    team_counts = {}
+    quick_joiners = set()
+    stmt = select(team_members.c.user_id, team_members.c.joined_at, Team.created_at).join(
         Team, team_members.c.team_id == Team.id
-    ).where(team_members.c.user_id == user.id)
-
+    ).where(team_members.c.user_id.in_(users))
     for result in db_session.execute(stmt):
-        if (result.joined_at - result.created_at) <= timedelta(days=1):
-            if award_badge(user.id, 'quick_joiner'):
-                new_badges.append(BADGES['quick_joiner'])
-                break
-
-    # Check Veteran Hacker badge
-    if len(user.teams) >= 5:
-        if award_badge(user.id, 'veteran_hacker'):
-            new_badges.append(BADGES['veteran_hacker'])
+        team_counts[result.user_id] = team_counts.get(result.user_id, 0) + 1
+        if result.joined_at and result.created_at and (result.joined_at - result.created_at) <= timedelta(days=1):
+            quick_joiners.add(result.user_id)
+
+    results = {}
+    for user_id in users:
+        led = led_counts.get(user_id, 0)
+        teams = team_counts.get(user_id, 0)
+        criteria = {
+            'team_creator': led >= 1,
+            'team_joiner': teams > 0,
+            'active_leader': led >= 3,
+            'quick_joiner': user_id in quick_joiners,
+            'veteran_hacker': teams >= 5
+        }
+
+        new_badges = []
+        for badge_key, met in criteria.items():
+            badge_id = badge_ids.get(BADGES[badge_key]['name'])
+            if not met or badge_id is None or (user_id, badge_id) in earned:
+                continue
+            db_session.add(Achievement(user_id=user_id, badge_id=badge_id))
+            earned.add((user_id, badge_id))
+            new_badges.append(BADGES[badge_key])
+        results[user_id] = new_badges
 
-    return new_badges
+    db_session.commit()
+    return results
 
 def get_user_badges(user_id: int) -> list:
     """Get all badges earned by a user"""
     achievements = db_session.query(Achievement).filter_by(user_id=user_id).all()
-    return [achievement.badge for achievement in achievements]
\ No newline at end of file
+    return [achievement.badge for achievement in achievements]
+
+def format_badge_message(badges: list) -> str:
+    """Format newly earned badges as an announcement message"""
+    badge_message = "🎉 You've earned new badges!\n"
+    for badge in badges:
+        badge_message += f"{badge['icon']} **{badge['name']}**: {badge['description']}\n"
+    return badge_message
+
+class BadgeQueue:
+    """
+    Background queue for badge evaluation. Triggers for the same user that arrive
+    within BADGE_COALESCE_WINDOW are merged, pending users are evaluated together in
+    a worker thread, and new badges are announced as follow-ups on the most recent
+    interaction for each user. Users in a failed batch are retried up to
+    BADGE_MAX_ATTEMPTS times.
+    """
+    def __init__(self, window: float = BADGE_COALESCE_WINDOW):
+        self.window = window
+        self._pending = {}
+        self._attempts = {}
+        self._wakeup = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        """Start the worker task on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Evaluate any pending triggers without waiting for the window, then stop the worker"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    def enqueue(self, user_id: int, interaction=None):
+        """Schedule badge evaluation for a user; the interaction is used for announcements"""
+        self._pending[user_id] = interaction
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            # Let repeated triggers for the same users accumulate before evaluating
+            if not self._stopping.is_set():
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.window)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            batch, self._pending = self._pending, {}
+            if batch:
+                await self._process(batch)
+            if self._stopping.is_set() and not self._pending:
+                return
+
+    async def _process(self, batch: dict):
+        try:
+            results = await asyncio.to_thread(self._evaluate_batch, list(batch))
+        except Exception as e:
+            logger.error(f"Error evaluating badges: {str(e)}")
+            self._requeue(batch)
+            return
+
+        for user_id in batch:
+            self._attempts.pop(user_id, None)
+
+        for user_id, new_badges in results.items():
+            interaction = batch[user_id]
+            if not new_badges or interaction is None:
+                continue
+            try:
+                await interaction.followup.send(format_badge_message(new_badges))
+            except Exception as e:
+                logger.error(f"Error announcing badges for user {user_id}: {str(e)}")
+
+    def _requeue(self, batch: dict):
+        """Put a failed batch's users back in the queue until they run out of attempts"""
+        for user_id, interaction in batch.items():
+            attempts = self._attempts.get(user_id, 0) + 1
+            if attempts >= BADGE_MAX_ATTEMPTS:
+                self._attempts.pop(user_id, None)
+                logger.error(f"Giving up on badge evaluation for user {user_id} after {attempts} attempts")
+                continue
+            self._attempts[user_id] = attempts
+            # A newer trigger's interaction takes precedence for the announcement
+            self._pending.setdefault(user_id, interaction)
+        if self._pending:
+            self._wakeup.set()
+
+    @staticmethod
+    def _evaluate_batch(user_ids: list) -> dict:
+        """Evaluate badges for a batch of users in a worker thread"""
+        try:
+            return check_and_award_badges_batch(user_ids)
+        except Exception:
+            db_session.rollback()
+            raise
+        finally:
+            # Worker threads get their own scoped session; release it after the batch
+            db_session.remove()
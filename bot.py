@@ -1,16 +1,20 @@
 import os
+import io
+import asyncio
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
 import logging
 from scrapers import HackathonScraper
 from datetime import datetime
-from utils import format_hackathon_message, get_common_timezones, format_date
+from utils import format_hackathon_message, get_common_timezones, format_date, truncate_text, format_member_list
 import pytz
 from dateutil import parser
 from app import db_session
 from models import User, Team, team_members
-from badge_utils import initialize_badges, check_and_award_badges, get_user_badges
+from badge_utils import initialize_badges, get_user_badges, BadgeQueue
+from team_queries import team_cache, get_team_roster, list_hackathon_teams
+from diagnostics import watchdog, slow_log, sample_stacks, profile_running, MAX_PROFILE_SECONDS
 
 # Configure logging
 logging.basicConfig(
@@ -35,12 +39,22 @@ class HackathonBot(commands.Bot):
         self.scraper = HackathonScraper()
         self.notification_channels = set()
         self.user_timezones = {}
+        self.badge_queue = BadgeQueue()
 
     async def setup_hook(self):
+        watchdog.start(asyncio.get_running_loop())
         await self.tree.sync()
         initialize_badges()
+        self.badge_queue.start()
         self.check_hackathons.start()
 
+    async def close(self):
+        # Stop the watchdog first so shutdown isn't reported as a loop stall
+        watchdog.stop()
+        # Flush pending badge evaluations while the connection can still send announcements
+        await self.badge_queue.stop()
+        await super().close()
+
 bot = HackathonBot()
 tree = bot.tree
 
@@ -59,6 +73,7 @@ async def on_error(event, *args, **kwargs):
     logger.error(f'Error in {event}:', exc_info=True)
 
 @tree.command(name="hackathons", description="Shows current hackathons from various platforms")
+@slow_log
 async def get_hackathons(interaction: discord.Interaction):
     """Command to fetch current hackathons"""
     try:
@@ -95,6 +110,7 @@ async def get_hackathons(interaction: discord.Interaction):
         await interaction.response.send_message("Sorry, there was an error fetching hackathon information.")
 
 @tree.command(name="set_timezone", description="Set your preferred timezone for hackathon times")
+@slow_log
 async def set_timezone(interaction: discord.Interaction, timezone: str = None):
     if not timezone:
         common_tzs = get_common_timezones()
@@ -123,6 +139,7 @@ async def set_timezone(interaction: discord.Interaction, timezone: str = None):
         await interaction.response.send_message("❌ Invalid timezone! Use `/set_timezone` to see available options.")
 
 @tree.command(name="create_team", description="Create a new team for a hackathon")
+@slow_log
 async def create_team(
     interaction: discord.Interaction,
     hackathon_id: str,
@@ -156,14 +173,7 @@ async def create_team(
         # Add creator as first member
         team.members.append(user)
         db_session.commit()
-
-        # After successful team creation, check for new badges
-        new_badges = check_and_award_badges(user.id)
-        if new_badges:
-            badge_message = "🎉 You've earned new badges!\n"
-            for badge in new_badges:
-                badge_message += f"{badge['icon']} **{badge['name']}**: {badge['description']}\n"
-            await interaction.followup.send(badge_message)
+        team_cache.invalidate_hackathon(hackathon_id)
 
         embed = discord.Embed(
             title="✅ Team Created Successfully!",
@@ -175,11 +185,15 @@ async def create_team(
 
         await interaction.response.send_message(embed=embed)
 
+        # Badges are evaluated in the background and announced as a follow-up
+        bot.badge_queue.enqueue(user.id, interaction)
+
     except Exception as e:
         logger.error(f"Error creating team: {str(e)}")
         await interaction.response.send_message("❌ There was an error creating your team. Please try again.")
 
 @tree.command(name="join_team", description="Join an existing team")
+@slow_log
 async def join_team(interaction: discord.Interaction, team_name: str, hackathon_id: str):
     """Join an existing team"""
     try:
@@ -204,22 +218,78 @@ async def join_team(interaction: discord.Interaction, team_name: str, hackathon_
         # Add user to team
         team.members.append(user)
         db_session.commit()
-
-        # After successfully joining, check for new badges
-        new_badges = check_and_award_badges(user.id)
-        if new_badges:
-            badge_message = "🎉 You've earned new badges!\n"
-            for badge in new_badges:
-                badge_message += f"{badge['icon']} **{badge['name']}**: {badge['description']}\n"
-            await interaction.followup.send(badge_message)
+        team_cache.invalidate_hackathon(hackathon_id)
 
         await interaction.response.send_message(f"✅ You have successfully joined team {team_name}!")
 
+        # Badges are evaluated in the background and announced as a follow-up
+        bot.badge_queue.enqueue(user.id, interaction)
+
     except Exception as e:
         logger.error(f"Error joining team: {str(e)}")
         await interaction.response.send_message("❌ There was an error joining the team. Please try again.")
 
+@tree.command(name="team_info", description="Show a team's details and members")
+@slow_log
+async def team_info(interaction: discord.Interaction, team_name: str, hackathon_id: str):
+    """Show a team's roster"""
+    try:
+        roster = get_team_roster(hackathon_id, team_name)
+        if not roster:
+            await interaction.response.send_message("❌ Team not found!")
+            return
+
+        embed = discord.Embed(
+            title=truncate_text(f"Team {roster['name']}", 256),
+            description=truncate_text(roster['description'] or "No description provided.", 1024),
+            color=discord.Color.blue()
+        )
+        embed.add_field(name="Hackathon", value=truncate_text(roster['hackathon_id'], 256), inline=True)
+        embed.add_field(name="Leader", value=roster['leader'] or "Unknown", inline=True)
+        embed.add_field(
+            name=f"Members ({len(roster['members'])})",
+            value=format_member_list(roster['members']) or "No members yet.",
+            inline=False
+        )
+
+        await interaction.response.send_message(embed=embed)
+
+    except Exception as e:
+        logger.error(f"Error showing team info: {str(e)}")
+        await interaction.response.send_message("❌ There was an error fetching the team. Please try again.")
+
+@tree.command(name="teams", description="List the teams registered for a hackathon")
+@slow_log
+async def list_teams(interaction: discord.Interaction, hackathon_id: str, after: int = 0):
+    """List teams for a hackathon, one page at a time"""
+    try:
+        teams, next_cursor = list_hackathon_teams(hackathon_id, after_id=after)
+        if not teams:
+            await interaction.response.send_message("No teams found for this hackathon.")
+            return
+
+        embed = discord.Embed(
+            title=truncate_text(f"Teams for {hackathon_id}", 256),
+            color=discord.Color.blue()
+        )
+        # Field sizes are capped so a full page stays under Discord's 6000 character embed limit
+        for team in teams:
+            embed.add_field(
+                name=truncate_text(f"{team['name']} ({team['member_count']} members)", 256),
+                value=truncate_text(team['description'] or "No description provided.", 200),
+                inline=False
+            )
+        if next_cursor is not None:
+            embed.set_footer(text=f"More teams available: run /teams again with after:{next_cursor}")
+
+        await interaction.response.send_message(embed=embed)
+
+    except Exception as e:
+        logger.error(f"Error listing teams: {str(e)}")
+        await interaction.response.send_message("❌ There was an error listing teams. Please try again.")
+
 @tree.command(name="badges", description="Display your earned achievement badges")
+@slow_log
 async def show_badges(interaction: discord.Interaction):
     """Show your earned badges"""
     try:
@@ -253,6 +323,44 @@ async def show_badges(interaction: discord.Interaction):
         logger.error(f"Error showing badges: {str(e)}")
         await interaction.response.send_message("❌ There was an error fetching your badges. Please try again.")
 
+@tree.command(name="profile", description="Owner: sample the bot process and return a collapsed-stack profile")
+@app_commands.default_permissions(administrator=True)
+async def profile(interaction: discord.Interaction, seconds: int = 10):
+    """Run a time-boxed sampling profile and return a flamegraph-compatible dump"""
+    # The profile covers the whole shared process, so only the bot owner may run it
+    if not await bot.is_owner(interaction.user):
+        await interaction.response.send_message("❌ Only the bot owner can run the profiler.", ephemeral=True)
+        return
+
+    if profile_running():
+        await interaction.response.send_message("⏳ A profile is already running. Try again later.", ephemeral=True)
+        return
+
+    seconds = max(1, min(seconds, MAX_PROFILE_SECONDS))
+    try:
+        await interaction.response.defer(ephemeral=True, thinking=True)
+    except Exception as e:
+        logger.error(f"Error deferring profile response: {str(e)}")
+        return
+
+    try:
+        # Sample from a worker thread so the event loop keeps running normally
+        collapsed = await asyncio.to_thread(sample_stacks, seconds)
+        if collapsed is None:
+            await interaction.followup.send("⏳ A profile is already running. Try again later.", ephemeral=True)
+            return
+
+        profile_file = discord.File(io.BytesIO(collapsed.encode()), filename="profile.folded")
+        await interaction.followup.send(
+            f"📊 Sampled for {seconds}s ({watchdog.stall_count} loop stalls detected since startup).",
+            file=profile_file,
+            ephemeral=True
+        )
+
+    except Exception as e:
+        logger.error(f"Error running profile: {str(e)}")
+        await interaction.followup.send("❌ There was an error running the profiler.", ephemeral=True)
+
 @tasks.loop(hours=6)
 async def check_hackathons():
     """Periodic task to check for new hackathons and notify channels"""
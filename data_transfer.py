@@ -0,0 +1,197 @@
+import os
+import sys
+import gzip
+import json
+import shutil
+import tempfile
+import logging
+import argparse
+from datetime import datetime
+from sqlalchemy import DateTime, select, func, text
+from app import Base, engine
+import models  # noqa: F401
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Tables in foreign-key order: parents are exported and imported before children.
+# Badges are included because achievements reference them by id.
+TABLES = ['user', 'badge', 'team', 'team_members', 'achievement']
+
+# Rows fetched per server-side cursor round trip and written per chunk file
+DEFAULT_CHUNK_SIZE = 10000
+
+# Written last during export; an export directory without it is incomplete
+MANIFEST_NAME = 'manifest.json'
+
+def _chunk_path(directory, table_name, index):
+    return os.path.join(directory, f"{table_name}-{index:05d}.ndjson.gz")
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _decode_row(table, row):
+    """Converts JSON values back into column types where JSON can't represent them"""
+    for column in table.columns:
+        value = row.get(column.name)
+        if value is not None and isinstance(column.type, DateTime):
+            row[column.name] = datetime.fromisoformat(value)
+    return row
+
+def export_table(conn, table, directory, chunk_size):
+    """
+    Streams a table through a server-side cursor into gzipped NDJSON chunk files.
+    Returns the number of rows written and the chunk file names.
+    """
+    result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(
+        select(table).order_by(*table.primary_key.columns)
+    )
+    total = 0
+    chunks = []
+    for index, partition in enumerate(result.mappings().partitions()):
+        path = _chunk_path(directory, table.name, index)
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            for row in partition:
+                f.write(json.dumps({key: _encode(value) for key, value in row.items()}))
+                f.write('\n')
+        total += len(partition)
+        chunks.append(os.path.basename(path))
+    return total, chunks
+
+def export_data(directory, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Exports all community tables to chunked NDJSON files in directory. The export
+    is written to a temporary directory with the manifest last, and only moved
+    into place once every table has been written.
+    """
+    directory = os.path.abspath(directory)
+    parent = os.path.dirname(directory)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=f".{os.path.basename(directory)}-", dir=parent)
+    try:
+        manifest = {'exported_at': datetime.utcnow().isoformat(), 'tables': []}
+        # A single repeatable-read transaction gives a consistent snapshot across tables
+        with engine.connect().execution_options(isolation_level="REPEATABLE READ") as conn:
+            for table_name in TABLES:
+                count, chunks = export_table(conn, Base.metadata.tables[table_name], staging, chunk_size)
+                manifest['tables'].append({'name': table_name, 'rows': count, 'chunks': chunks})
+                logger.info(f"Exported {count} rows from {table_name}")
+
+        with open(os.path.join(staging, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+        # Swap the finished export into place, keeping the old one until the rename succeeds
+        backup = None
+        if os.path.exists(directory):
+            backup = tempfile.mkdtemp(prefix=f".{os.path.basename(directory)}-old-", dir=parent)
+            os.rmdir(backup)
+            os.rename(directory, backup)
+        try:
+            os.rename(staging, directory)
+        except Exception:
+            if backup:
+                os.rename(backup, directory)
+            raise
+        if backup:
+            shutil.rmtree(backup)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+def read_manifest(directory):
+    """Loads the export manifest, refusing directories without a complete export"""
+    path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.isfile(path):
+        raise ValueError(f"No {MANIFEST_NAME} in {directory}; not a complete export")
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    tables = {entry['name']: entry for entry in manifest.get('tables', [])}
+    missing = [table_name for table_name in TABLES if table_name not in tables]
+    if missing:
+        raise ValueError(f"Manifest is missing tables: {', '.join(missing)}")
+    for entry in tables.values():
+        for chunk in entry['chunks']:
+            if not os.path.isfile(os.path.join(directory, chunk)):
+                raise ValueError(f"Chunk file {chunk} listed in manifest is missing")
+    return tables
+
+def _read_chunks(directory, chunks, chunk_size):
+    """Yields lists of at most chunk_size rows from the given chunk files"""
+    batch = []
+    for chunk in chunks:
+        with gzip.open(os.path.join(directory, chunk), 'rt', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                batch.append(json.loads(line))
+                if len(batch) >= chunk_size:
+                    yield batch
+                    batch = []
+    if batch:
+        yield batch
+
+def _reset_sequence(conn, table):
+    """Moves a Postgres serial sequence past the highest imported id"""
+    if conn.dialect.name != 'postgresql' or 'id' not in table.columns:
+        return
+    conn.execute(
+        text(
+            f"SELECT setval(pg_get_serial_sequence('\"{table.name}\"', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM \"{table.name}\"), 0) + 1, false)"
+        )
+    )
+
+def import_data(directory, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Bulk-loads chunked NDJSON files from directory into empty tables. Row counts
+    are checked against the manifest; any mismatch rolls back the whole import.
+    """
+    manifest = read_manifest(directory)
+    with engine.begin() as conn:
+        for table_name in TABLES:
+            table = Base.metadata.tables[table_name]
+            if conn.execute(select(func.count()).select_from(table)).scalar():
+                raise ValueError(f"Table {table_name} is not empty; import requires an empty database")
+
+        for table_name in TABLES:
+            table = Base.metadata.tables[table_name]
+            total = 0
+            for batch in _read_chunks(directory, manifest[table_name]['chunks'], chunk_size):
+                # executemany insert; SQLAlchemy batches these into multi-row INSERTs
+                conn.execute(table.insert(), [_decode_row(table, row) for row in batch])
+                total += len(batch)
+            if total != manifest[table_name]['rows']:
+                raise ValueError(
+                    f"Imported {total} rows into {table_name} but the manifest lists {manifest[table_name]['rows']}"
+                )
+            _reset_sequence(conn, table)
+            logger.info(f"Imported {total} rows into {table_name}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or import teams, memberships and achievements")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for name, help_text in (('export', 'Export data to a directory'), ('import', 'Import data from a directory')):
+        subparser = subparsers.add_parser(name, help=help_text)
+        subparser.add_argument('directory', help='Directory holding the chunk files')
+        subparser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                               help='Rows per chunk file / insert batch')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'export':
+            export_data(args.directory, args.chunk_size)
+        else:
+            import_data(args.directory, args.chunk_size)
+    except Exception as e:
+        logger.error(f"{args.command.capitalize()} failed: {str(e)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+import os
+import sys
+import time
+import logging
+import threading
+import traceback
+import functools
+import contextvars
+from collections import Counter
+from sqlalchemy import event
+from app import engine
+
+logger = logging.getLogger(__name__)
+
+# Thresholds in seconds, overridable from the environment
+LOOP_STALL_THRESHOLD = float(os.environ.get("LOOP_STALL_THRESHOLD", "0.25"))
+SLOW_COMMAND_THRESHOLD = float(os.environ.get("SLOW_COMMAND_THRESHOLD", "1.0"))
+MAX_PROFILE_SECONDS = 60
+
+# Only one sampling profile may run at a time
+_profile_lock = threading.Lock()
+
+# Per-task query counter, set while a tracked command is running
+_query_counter = contextvars.ContextVar("query_counter", default=None)
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    """Counts statements issued while a tracked command is running"""
+    counter = _query_counter.get()
+    if counter is not None:
+        counter[0] += 1
+
+def slow_log(func):
+    """
+    Wraps a command callback and logs it when it runs longer than
+    SLOW_COMMAND_THRESHOLD, along with the number of SQL queries it issued
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        counter = [0]
+        token = _query_counter.set(counter)
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            _query_counter.reset(token)
+            if elapsed >= SLOW_COMMAND_THRESHOLD:
+                logger.warning(
+                    f"Slow command {func.__name__}: {elapsed * 1000:.0f} ms, {counter[0]} queries"
+                )
+    return wrapper
+
+class LoopWatchdog:
+    """
+    Detects event loop stalls. A heartbeat callback is scheduled on the loop and a
+    monitor thread checks that it keeps firing; when it doesn't, the stack of the
+    loop thread is logged so the blocking call can be identified.
+    """
+    def __init__(self, threshold=LOOP_STALL_THRESHOLD, interval=0.1):
+        self.threshold = threshold
+        self.interval = interval
+        self.stall_count = 0
+        self._loop = None
+        self._loop_thread_id = None
+        self._last_beat = time.monotonic()
+        self._stall_started = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, loop):
+        """Starts monitoring the given loop; must be called from the loop's thread"""
+        if self._thread is not None:
+            return
+        self._loop = loop
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._loop.call_soon(self._beat)
+        self._thread = threading.Thread(target=self._monitor, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(f"Loop watchdog started (threshold {self.threshold * 1000:.0f} ms)")
+
+    def stop(self):
+        """Stops the monitor thread"""
+        self._stop.set()
+
+    def _beat(self):
+        self._last_beat = time.monotonic()
+        stall_started, self._stall_started = self._stall_started, None
+        if stall_started is not None:
+            # The heartbeat was due at stall_started; report how long it was actually held up
+            duration = self._last_beat - stall_started
+            logger.warning(f"Event loop stall ended after {duration * 1000:.0f} ms")
+        if not self._stop.is_set():
+            self._loop.call_later(self.interval, self._beat)
+
+    def _monitor(self):
+        while not self._stop.wait(self.interval):
+            due = self._last_beat + self.interval
+            lag = time.monotonic() - due
+            if lag < self.threshold or self._stall_started is not None:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            # Skip if the heartbeat fired while the stack was being captured
+            if frame is None or self._last_beat + self.interval != due:
+                continue
+            self._stall_started = due
+            self.stall_count += 1
+            stack = "".join(traceback.format_stack(frame))
+            logger.warning(f"Event loop blocked for over {lag * 1000:.0f} ms, stack:\n{stack}")
+
+def _collapse_frame(frame):
+    """Walks a frame chain and returns its root-first frame labels"""
+    labels = []
+    while frame is not None:
+        code = frame.f_code
+        labels.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+def sample_stacks(seconds, interval=0.005):
+    """
+    Samples the stacks of every thread in the process for the given number of
+    seconds and returns them in collapsed-stack format (one "frame;frame;... count"
+    line per unique stack), which can be fed straight to flamegraph tools.
+    Returns None if another profile is already running.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    try:
+        return _sample_stacks(seconds, interval)
+    finally:
+        _profile_lock.release()
+
+def profile_running():
+    """Returns True while a sampling profile is in progress"""
+    return _profile_lock.locked()
+
+def _sample_stacks(seconds, interval):
+    seconds = max(1, min(seconds, MAX_PROFILE_SECONDS))
+    own_id = threading.get_ident()
+    counts = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            labels = _collapse_frame(frame)
+            labels.insert(0, names.get(thread_id, str(thread_id)))
+            counts[";".join(labels)] += 1
+        time.sleep(interval)
+    return "\n".join(f"{stack} {count}" for stack, count in counts.most_common()) + "\n"
+
+watchdog = LoopWatchdog()
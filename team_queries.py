@@ -0,0 +1,128 @@
+import time
+import threading
+from collections import OrderedDict
+from sqlalchemy import select, func
+from app import db_session
+from models import User, Team, team_members
+
+# Seconds a cached roster or team listing stays valid
+TEAM_CACHE_TTL = 30
+TEAM_CACHE_MAX_ENTRIES = 1024
+TEAMS_PAGE_SIZE = 10
+
+class TTLCache:
+    """
+    Small in-process cache with per-entry expiry and a cap on the number of
+    entries. Keys are tuples whose second element is the hackathon id, so all
+    entries for a hackathon can be dropped when one of its teams changes.
+    """
+    def __init__(self, ttl: float = TEAM_CACHE_TTL, max_entries: int = TEAM_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # Entries are kept in insertion order, which with a fixed TTL is also expiry order
+        self._entries = OrderedDict()
+        self._keys_by_hackathon = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._remove(key)
+            now = time.monotonic()
+            # Drop expired entries, then the oldest ones if the cache is still full
+            while self._entries:
+                oldest_key, (expires_at, _) = next(iter(self._entries.items()))
+                if expires_at >= now and len(self._entries) < self.max_entries:
+                    break
+                self._remove(oldest_key)
+            self._entries[key] = (now + self.ttl, value)
+            self._keys_by_hackathon.setdefault(key[1], set()).add(key)
+
+    def invalidate_hackathon(self, hackathon_id: str):
+        """Drop every cached entry belonging to a hackathon"""
+        with self._lock:
+            for key in list(self._keys_by_hackathon.get(hackathon_id, ())):
+                self._remove(key)
+
+    def _remove(self, key):
+        if self._entries.pop(key, None) is None:
+            return
+        keys = self._keys_by_hackathon[key[1]]
+        keys.discard(key)
+        if not keys:
+            del self._keys_by_hackathon[key[1]]
+
+team_cache = TTLCache()
+
+def get_team_roster(hackathon_id: str, team_name: str):
+    """
+    Get a team and its member usernames as plain data, or None if the team doesn't
+    exist. Members are loaded with a single joined query ordered by join time.
+    """
+    key = ('roster', hackathon_id, team_name)
+    roster = team_cache.get(key)
+    if roster is not None:
+        return roster
+
+    team = db_session.query(Team).filter_by(hackathon_id=hackathon_id, name=team_name).first()
+    if not team:
+        return None
+
+    stmt = select(User.id, User.username).join(
+        team_members, team_members.c.user_id == User.id
+    ).where(team_members.c.team_id == team.id).order_by(team_members.c.joined_at, User.id)
+
+    members = []
+    leader = None
+    for row in db_session.execute(stmt):
+        members.append(row.username)
+        if row.id == team.leader_id:
+            leader = row.username
+
+    roster = {
+        'name': team.name,
+        'hackathon_id': team.hackathon_id,
+        'description': team.description,
+        'leader': leader,
+        'members': members
+    }
+    team_cache.set(key, roster)
+    return roster
+
+def list_hackathon_teams(hackathon_id: str, after_id: int = 0, limit: int = TEAMS_PAGE_SIZE):
+    """
+    Get one page of teams registered for a hackathon, ordered by team id.
+    Uses keyset pagination: pass the returned cursor as after_id to get the next
+    page. The cursor is None when there are no more teams.
+    """
+    key = ('teams', hackathon_id, after_id, limit)
+    page = team_cache.get(key)
+    if page is not None:
+        return page
+
+    # Member counts come from a grouped join; fetch one extra row to know whether another page exists
+    member_count = func.count(team_members.c.user_id).label('member_count')
+    stmt = select(Team.id, Team.name, Team.description, member_count).outerjoin(
+        team_members, team_members.c.team_id == Team.id
+    ).where(
+        Team.hackathon_id == hackathon_id, Team.id > after_id
+    ).group_by(Team.id).order_by(Team.id).limit(limit + 1)
+
+    rows = db_session.execute(stmt).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    page = ([dict(row._mapping) for row in rows], rows[-1].id if has_more else None)
+    # Empty pages aren't cached so lookups of unknown hackathon ids can't fill the cache
+    if rows:
+        team_cache.set(key, page)
+    return page
@@ -62,4 +62,29 @@ def get_common_timezones():
         'Europe/London', 'Europe/Paris', 'Europe/Berlin',
         'Asia/Dubai', 'Asia/Singapore', 'Asia/Tokyo',
         'Australia/Sydney', 'Pacific/Auckland'
-    ]
\ No newline at end of file
+    ]
+
+def truncate_text(text, max_length):
+    """Shortens text to at most max_length characters, ending with an ellipsis if cut"""
+    if len(text) <= max_length:
+        return text
+    return text[:max_length - 1] + '…'
+
+def format_member_list(members, max_members=25, max_length=1024):
+    """
+    Formats member names one per line for an embed field, showing at most
+    max_members names and staying within Discord's field length limit
+    """
+    shown = []
+    length = 0
+    for name in members[:max_members]:
+        # Leave room for the "…and K more" line
+        if length + len(name) + 1 > max_length - 20:
+            break
+        shown.append(name)
+        length += len(name) + 1
+
+    remaining = len(members) - len(shown)
+    if remaining:
+        shown.append(f"…and {remaining} more")
+    return "\n".join(shown)